@@ -1,66 +1,339 @@
+import os
 import cv2
 import mediapipe as mp
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
 
 class BodyDetector:
-    def __init__(self):
+    # Keys of the analyze() result mapped to the MediaPipe graph attributes
+    _GRAPH_ATTRS = {
+        'face': 'face_detector',
+        'mesh': 'face_mesh',
+        'pose': 'pose',
+        'hands': 'hands'
+    }
+    
+    # Pose wrist landmarks (left, right) that gate hand detection
+    WRIST_INDICES = (15, 16)
+    WRIST_VISIBILITY = 0.5
+    
+    # Accuracy profiles: (pose/hands model_complexity, face mesh refine_landmarks)
+    ACCURACY_PROFILES = {
+        'fast': (0, False),
+        'balanced': (1, False),
+        'accurate': (2, True)
+    }
+    
+    # Correct MediaPipe Face Mesh indices
+    FACIAL_REGION_INDICES = {
+        'left_eye': [33, 7, 163, 144, 145, 153, 154, 155, 133, 173, 157, 158, 159, 160, 161, 246],
+        'right_eye': [362, 382, 381, 380, 374, 373, 390, 249, 263, 466, 388, 387, 386, 385, 384, 398],
+        'left_eyebrow': [70, 63, 105, 66, 107, 55, 65, 52, 53, 46],
+        'right_eyebrow': [300, 293, 334, 296, 336, 285, 295, 282, 283, 276],
+        'mouth_outer': [61, 146, 91, 181, 84, 17, 314, 405, 320, 307, 375, 321, 308, 324, 318, 402, 317, 14, 87, 178, 88, 95],
+        'mouth_inner': [78, 95, 88, 178, 87, 14, 317, 402, 318, 324, 308, 415, 310, 311, 312, 13, 82, 81, 80, 191],
+        'nose_tip': [1, 2, 98, 327],
+        'nose_bridge': [168, 6, 197, 195, 5, 4],
+        'face_oval': [10, 338, 297, 332, 284, 251, 389, 356, 454, 323, 361, 288, 397, 365, 379, 378, 400, 377, 152, 148, 176, 149, 150, 136, 172, 58, 132, 93, 234, 127, 162, 21, 54, 103, 67, 109]
+    }
+
+    # Face overlay detail: full tesselation, region contours only, or nothing
+    DRAW_DETAILS = ('mesh', 'contours', 'none')
+    
+    def __init__(self, profile='balanced', static=False, detection_width=640, draw_detail='contours',
+                 full_res_mesh=True, holistic=False):
+        """Create MediaPipe graphs; static=True suits single-image callers (no tracking state)"""
+        if profile not in self.ACCURACY_PROFILES:
+            raise ValueError(f"Unknown accuracy profile: {profile}")
+        complexity, refine_landmarks = self.ACCURACY_PROFILES[profile]
+        self.profile = profile
+        self.static = static
+        if draw_detail not in self.DRAW_DETAILS:
+            raise ValueError(f"Unknown draw detail: {draw_detail}")
+        self.draw_detail = draw_detail
+        # Frames wider than this are downscaled before inference; landmarks
+        # are normalized, so they still map onto the full-resolution frame
+        self.detection_width = detection_width
+        # Face mesh feeds emotion features, so by default it gets the full-resolution
+        # frame while face detection, pose and hands run on the downscaled one
+        self.full_res_mesh = full_res_mesh
+        # Holistic runs pose, face and hands in one graph that shares the
+        # preprocessing and detection stages; it yields no face detections
+        self.use_holistic = holistic
+        
+        # Keep OpenCV on its SIMD-optimized code paths for resize/cvtColor
+        cv2.setUseOptimized(True)
+        cv2.setNumThreads(os.cpu_count() or 1)
+        
         self.mp_pose = mp.solutions.pose
         self.mp_face = mp.solutions.face_detection
         self.mp_hands = mp.solutions.hands
         self.mp_face_mesh = mp.solutions.face_mesh
         
-        self.pose = self.mp_pose.Pose(
-            static_image_mode=False,
-            model_complexity=1,
-            smooth_landmarks=True,
-            min_detection_confidence=0.5,  # Reduced for better detection
-            min_tracking_confidence=0.5
+        self._create_graphs(static, complexity, refine_landmarks)
+        
+        self.mp_draw = mp.solutions.drawing_utils
+        self.face_mesh_connections = mp.solutions.face_mesh.FACEMESH_TESSELATION
+        self.hand_connections = mp.solutions.hands.HAND_CONNECTIONS
+        
+        # Custom drawing specs
+        self.face_mesh_drawing_spec = self.mp_draw.DrawingSpec(
+            color=(0, 255, 0), thickness=1, circle_radius=1
+        )
+        self.hand_drawing_spec = self.mp_draw.DrawingSpec(
+            color=(0, 0, 255), thickness=2, circle_radius=2
         )
         
+        # Pose/hand specs shared across frames instead of rebuilt per draw call
+        self._pose_point_spec = self.mp_draw.DrawingSpec(color=(0, 255, 0), thickness=3, circle_radius=3)
+        self._pose_conn_spec = self.mp_draw.DrawingSpec(color=(0, 255, 0), thickness=3)
+        self._hand_point_spec = self.mp_draw.DrawingSpec(color=(0, 0, 255), thickness=3, circle_radius=3)
+        self._hand_conn_spec = self.mp_draw.DrawingSpec(color=(0, 0, 255), thickness=3)
+        
+        # Facial region index tables are invariant, so build them once
+        self._region_indices = {
+            name: np.asarray(indices, dtype=np.int32)
+            for name, indices in self.FACIAL_REGION_INDICES.items()
+        }
+        self._max_region_index = max(int(idx.max()) for idx in self._region_indices.values())
+        
+        # Persistent worker so the GIL-releasing face and body graph chains run
+        # concurrently without spawning threads every frame. Each graph keeps
+        # its own state and only ever runs in one chain, so this is safe.
+        self._pool = ThreadPoolExecutor(max_workers=1)
+        
+        # Reused per-frame buffers for the downscaled, RGB and full-resolution mesh images
+        self._small_buf = None
+        self._rgb_buf = None
+        self._mesh_rgb_buf = None
+    
+    def _create_graphs(self, static, complexity, refine_landmarks):
+        """Create the Holistic graph, or the separate face detection, face mesh, pose and hands graphs"""
+        if self.use_holistic:
+            self.holistic = self._with_bundled_pose_model(lambda c: mp.solutions.holistic.Holistic(
+                static_image_mode=static,
+                model_complexity=c,
+                smooth_landmarks=True,
+                refine_face_landmarks=refine_landmarks,
+                min_detection_confidence=0.5,
+                min_tracking_confidence=0.5
+            ), complexity)
+            return
+        
+        self.pose = self._build_pose(static, complexity)
         self.face_detector = self.mp_face.FaceDetection(
             model_selection=0,
             min_detection_confidence=0.5
         )
-        
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
-            static_image_mode=False,
+        self.face_mesh = self._build_face_mesh(static, refine_landmarks)
+        self.hands = self._build_hands(static, complexity)
+    
+    def _build_pose(self, static, complexity):
+        """Create the Pose graph for a model complexity"""
+        return self._with_bundled_pose_model(lambda c: self.mp_pose.Pose(
+            static_image_mode=static,
+            model_complexity=c,
+            smooth_landmarks=True,
+            min_detection_confidence=0.5,  # Reduced for better detection
+            min_tracking_confidence=0.5
+        ), complexity)
+    
+    def _build_face_mesh(self, static, refine_landmarks):
+        """Create the FaceMesh graph, with or without refined eye/lip landmarks"""
+        return self.mp_face_mesh.FaceMesh(
+            static_image_mode=static,
             max_num_faces=1,
-            refine_landmarks=True,
+            refine_landmarks=refine_landmarks,
             min_detection_confidence=0.5,
             min_tracking_confidence=0.5
         )
-        
-        self.hands = self.mp_hands.Hands(
-            static_image_mode=False,
+    
+    def _build_hands(self, static, complexity):
+        """Create the Hands graph for a model complexity"""
+        return self.mp_hands.Hands(
+            static_image_mode=static,
             max_num_hands=2,
-            model_complexity=1,
+            model_complexity=min(complexity, 1),  # Hands only ships 0 and 1
             min_detection_confidence=0.5,  # Reduced threshold
             min_tracking_confidence=0.5
         )
+    
+    def _with_bundled_pose_model(self, build, complexity):
+        """Build a pose graph, falling back to the bundled complexity-1 model if another can't be fetched"""
+        # Only the complexity-1 pose model ships with MediaPipe; lite (0) and
+        # heavy (2) are downloaded into the package on first use
+        try:
+            return build(complexity)
+        except Exception as e:
+            if complexity == 1:
+                raise
+            print(f"Warning: pose model_complexity={complexity} unavailable ({e}), "
+                  f"using the bundled model_complexity=1")
+            return build(1)
+    
+    def analyze(self, image, body=True):
+        """Run the MediaPipe graphs on a single shared RGB conversion of the frame"""
+        # Contract: image is a C-contiguous uint8 BGR frame (CameraStream ensures
+        # this) so OpenCV's vectorized resize/cvtColor kernels apply
+        rgb_image = self._to_detection_rgb(image)
+        h, w = image.shape[:2]
+        if self.use_holistic:
+            return self._run_holistic(rgb_image, (h, w))
         
-        self.mp_draw = mp.solutions.drawing_utils
-        self.face_mesh_connections = mp.solutions.face_mesh.FACEMESH_TESSELATION
-        self.hand_connections = mp.solutions.hands.HAND_CONNECTIONS
+        # The face chain runs on the pool while the body chain runs here; each
+        # chain starts its heavy graph as soon as its own light graph is done
+        if body:
+            face_future = self._pool.submit(self._run_face_chain, rgb_image, image)
+            try:
+                pose_results, hands_results = self._run_body_chain(rgb_image)
+            finally:
+                # Never return while the worker may still read the shared buffers,
+                # or the next frame would overwrite them under it
+                face_future.exception()
+            face_results, mesh_results = face_future.result()
+        else:
+            # body=False skips pose/hands for callers reusing earlier results
+            face_results, mesh_results = self._run_face_chain(rgb_image, image)
+            pose_results = hands_results = None
         
-        # Custom drawing specs
-        self.face_mesh_drawing_spec = self.mp_draw.DrawingSpec(
-            color=(0, 255, 0), thickness=1, circle_radius=1
+        return {
+            'face': face_results,
+            'mesh': mesh_results,
+            'pose': pose_results,
+            'hands': hands_results,
+            'hw': (h, w)
+        }
+    
+    def _run_face_chain(self, rgb_image, image):
+        """Face detection, then face mesh only if a face was found (else None)"""
+        face_results = self.face_detector.process(rgb_image)
+        if not face_results.detections:
+            return face_results, None
+        return face_results, self.face_mesh.process(self._mesh_input(rgb_image, image))
+    
+    def _mesh_input(self, rgb_image, image):
+        """Face mesh input: the full-resolution frame if enabled, else the detection image"""
+        if not self.full_res_mesh or image.shape[:2] == rgb_image.shape[:2]:
+            return rgb_image
+        
+        # Separate buffer: this runs on the pool while the body chain reads _rgb_buf
+        if self._mesh_rgb_buf is None or self._mesh_rgb_buf.shape != image.shape:
+            self._mesh_rgb_buf = np.empty_like(image)
+        self._mesh_rgb_buf.flags.writeable = True
+        cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=self._mesh_rgb_buf)
+        self._mesh_rgb_buf.flags.writeable = False
+        return self._mesh_rgb_buf
+    
+    def _run_body_chain(self, rgb_image):
+        """Pose, then hands only if a wrist is visible (else None)"""
+        pose_results = self.pose.process(rgb_image)
+        hands_results = self.hands.process(rgb_image) if self._wrists_visible(pose_results) else None
+        return pose_results, hands_results
+    
+    def _run_holistic(self, rgb_image, hw):
+        """Run the Holistic graph and repackage its output like the separate graphs'"""
+        results = self.holistic.process(rgb_image)
+        
+        mesh_results = SimpleNamespace(
+            multi_face_landmarks=[results.face_landmarks] if results.face_landmarks else None
         )
-        self.hand_drawing_spec = self.mp_draw.DrawingSpec(
-            color=(0, 0, 255), thickness=2, circle_radius=2
+        
+        # Holistic hands carry no handedness score; report them as fully confident
+        hand_landmarks, handedness = [], []
+        for label, landmarks in (('Left', results.left_hand_landmarks),
+                                 ('Right', results.right_hand_landmarks)):
+            if landmarks:
+                hand_landmarks.append(landmarks)
+                handedness.append(SimpleNamespace(
+                    classification=[SimpleNamespace(label=label, score=1.0)]
+                ))
+        hands_results = SimpleNamespace(
+            multi_hand_landmarks=hand_landmarks or None,
+            multi_handedness=handedness or None
+        )
+        
+        return {
+            'face': None,
+            'mesh': mesh_results,
+            'pose': results,
+            'hands': hands_results,
+            'hw': hw
+        }
+    
+    def _wrists_visible(self, pose_results):
+        """Check whether the pose result shows at least one wrist"""
+        if not pose_results.pose_landmarks:
+            return False
+        landmarks = pose_results.pose_landmarks.landmark
+        return any(landmarks[idx].visibility > self.WRIST_VISIBILITY for idx in self.WRIST_INDICES)
+    
+    def _get_results(self, image, analysis, key):
+        """Get (results, (h, w)) from a shared analysis, or run a single graph on the image"""
+        if analysis is not None:
+            return analysis[key], analysis['hw']
+        if self.use_holistic:
+            analysis = self.analyze(image)
+            return analysis[key], analysis['hw']
+        
+        rgb_image = self._to_detection_rgb(image)
+        if key == 'mesh':
+            rgb_image = self._mesh_input(rgb_image, image)
+        graph = getattr(self, self._GRAPH_ATTRS[key])
+        return graph.process(rgb_image), image.shape[:2]
+    
+    def allocate_buffers(self, frame_shape):
+        """Preallocate the per-frame buffers for a known (h, w, 3) input shape"""
+        shape = self._detection_shape(frame_shape)
+        if shape != tuple(frame_shape):
+            self._small_buf = np.empty(shape, dtype=np.uint8)
+        self._rgb_buf = np.empty(shape, dtype=np.uint8)
+        if self.full_res_mesh and shape != tuple(frame_shape):
+            self._mesh_rgb_buf = np.empty(frame_shape, dtype=np.uint8)
+    
+    def _detection_shape(self, frame_shape):
+        """Shape of the frame after downscaling to detection_width (unchanged if narrower)"""
+        h, w = frame_shape[:2]
+        if w <= self.detection_width:
+            return tuple(frame_shape)
+        return (round(h * self.detection_width / w), self.detection_width) + tuple(frame_shape[2:])
+    
+    def _to_detection_rgb(self, image):
+        """Downscale the frame to the detection resolution and convert it to read-only RGB"""
+        shape = self._detection_shape(image.shape)
+        if shape != image.shape:
+            size = (shape[1], shape[0])
+            # Buffers normally come from allocate_buffers; reallocate if the input size changed
+            if self._small_buf is None or self._small_buf.shape != shape:
+                self._small_buf = np.empty(shape, dtype=image.dtype)
+            cv2.resize(image, size, dst=self._small_buf, interpolation=cv2.INTER_AREA)
+            image = self._small_buf
+        
+        if self._rgb_buf is None or self._rgb_buf.shape != image.shape:
+            self._rgb_buf = np.empty_like(image)
+        self._rgb_buf.flags.writeable = True
+        cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=self._rgb_buf)
+        # Read-only input lets MediaPipe skip its defensive copy
+        self._rgb_buf.flags.writeable = False
+        return self._rgb_buf
+    
+    def _landmarks_to_array(self, landmark_list, w, h):
+        """Scale normalized landmarks to an (N, 4) float32 array of pixel x, y, z, visibility"""
+        coords = np.array(
+            [[lm.x, lm.y, lm.z, lm.visibility] for lm in landmark_list.landmark],
+            dtype=np.float32
         )
+        return coords * np.array([w, h, 1.0, 1.0], dtype=np.float32)
            
-    def detect_face(self, image):
+    def detect_face(self, image, analysis=None):
         """Detect faces in the image"""
         try:
-            rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            results = self.face_detector.process(rgb_image)
+            results, (h, w) = self._get_results(image, analysis, 'face')
             
             faces = []
-            if results.detections:
+            if results is not None and results.detections:
                 for detection in results.detections:
                     bbox = detection.location_data.relative_bounding_box
-                    h, w, c = image.shape
                     x = int(bbox.xmin * w)
                     y = int(bbox.ymin * h)
                     width = int(bbox.width * w)
@@ -77,37 +350,33 @@ class BodyDetector:
             print(f"Error in face detection: {e}")
             return []
     
-    def detect_face_mesh(self, image):
+    def detect_face_mesh(self, image, analysis=None):
         """Detect detailed face mesh with 468 landmarks"""
         try:
-            rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            results = self.face_mesh.process(rgb_image)
+            results, (h, w) = self._get_results(image, analysis, 'mesh')
+            
+            # Face mesh has no score of its own; use the face detector's when available
+            detections = None
+            if analysis is not None and analysis['face'] is not None:
+                detections = analysis['face'].detections
             
             face_meshes = []
-            if results.multi_face_landmarks:
+            if results is not None and results.multi_face_landmarks:
                 for face_landmarks in results.multi_face_landmarks:
-                    landmarks = []
-                    h, w, c = image.shape
-                    
-                    for idx, lm in enumerate(face_landmarks.landmark):
-                        landmarks.append({
-                            'id': idx,
-                            'x': int(lm.x * w),
-                            'y': int(lm.y * h),
-                            'z': lm.z,
-                            'visibility': lm.visibility if hasattr(lm, 'visibility') else 1.0
-                        })
+                    landmarks_xyz = self._landmarks_to_array(face_landmarks, w, h)
+                    landmarks_xy = landmarks_xyz[:, :2].astype(np.int32)
                     
                     # Calculate bounding box from mesh points
-                    if landmarks:
-                        xs = [lm['x'] for lm in landmarks]
-                        ys = [lm['y'] for lm in landmarks]
-                        x_min, x_max = min(xs), max(xs)
-                        y_min, y_max = min(ys), max(ys)
+                    if len(landmarks_xy):
+                        x_min, y_min = landmarks_xy.min(0).tolist()
+                        x_max, y_max = landmarks_xy.max(0).tolist()
+                        bbox = (x_min, y_min, x_max - x_min, y_max - y_min)
                         
                         face_meshes.append({
-                            'landmarks': landmarks,
-                            'bbox': (x_min, y_min, x_max - x_min, y_max - y_min),
+                            'landmarks_xy': landmarks_xy,
+                            'landmarks_xyz': landmarks_xyz,
+                            'bbox': bbox,
+                            'score': self._mesh_face_score(bbox, detections, w, h),
                             'mesh': face_landmarks
                         })
                     
@@ -116,52 +385,56 @@ class BodyDetector:
             print(f"Error in face mesh detection: {e}")
             return []
     
-    def detect_pose(self, image):
-        """Detect body pose landmarks"""
+    def _mesh_face_score(self, bbox, detections, w, h):
+        """Score of the face detection overlapping the mesh bbox most, or 1.0 without detections"""
+        if not detections:
+            return 1.0
+        
+        x, y, bw, bh = bbox
+        best_overlap, best_score = 0, 0.0
+        for detection in detections:
+            box = detection.location_data.relative_bounding_box
+            dx = min(x + bw, (box.xmin + box.width) * w) - max(x, box.xmin * w)
+            dy = min(y + bh, (box.ymin + box.height) * h) - max(y, box.ymin * h)
+            overlap = max(dx, 0) * max(dy, 0)
+            if overlap > best_overlap:
+                best_overlap, best_score = overlap, detection.score[0]
+        # A mesh no detection supports is as untrustworthy as a low-scoring one
+        return best_score
+    
+    def detect_pose(self, image, analysis=None):
+        """Detect body pose landmarks as an (N, 4) array of pixel x, y, z, visibility"""
         try:
-            rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            results = self.pose.process(rgb_image)
+            results, (h, w) = self._get_results(image, analysis, 'pose')
             
             landmarks = []
             pose_data = None
-            if results.pose_landmarks:
+            if results is not None and results.pose_landmarks:
                 pose_data = results.pose_landmarks
-                for lm in results.pose_landmarks.landmark:
-                    h, w, c = image.shape
-                    landmarks.append({
-                        'x': int(lm.x * w),
-                        'y': int(lm.y * h),
-                        'z': lm.z,
-                        'visibility': lm.visibility
-                    })
+                landmarks = self._landmarks_to_array(pose_data, w, h)
                     
             return landmarks, pose_data
         except Exception as e:
             print(f"Error in pose detection: {e}")
             return [], None
     
-    def detect_hands(self, image):
+    def detect_hands(self, image, analysis=None):
         """Detect detailed hand landmarks with 21 points per hand - FIXED"""
         try:
-            rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            results = self.hands.process(rgb_image)
+            results, (h, w) = self._get_results(image, analysis, 'hands')
             
             hands_data = []
             hand_landmarks_list = []
             
-            if results.multi_hand_landmarks:
-                for hand_landmarks in results.multi_hand_landmarks:
-                    landmarks = []
-                    h, w, c = image.shape
-                    for idx, lm in enumerate(hand_landmarks.landmark):
-                        landmarks.append({
-                            'id': idx,
-                            'x': int(lm.x * w),
-                            'y': int(lm.y * h),
-                            'z': lm.z
-                        })
+            if results is not None and results.multi_hand_landmarks:
+                for hand_landmarks, handedness in zip(results.multi_hand_landmarks,
+                                                      results.multi_handedness):
+                    landmarks_xyz = self._landmarks_to_array(hand_landmarks, w, h)
+                    landmarks_xy = landmarks_xyz[:, :2].astype(np.int32)
                     hands_data.append({
-                        'landmarks': landmarks,
+                        'landmarks_xy': landmarks_xy,
+                        'landmarks_xyz': landmarks_xyz,
+                        'score': handedness.classification[0].score,
                         'mesh': hand_landmarks
                     })
                     hand_landmarks_list.append(hand_landmarks)
@@ -174,56 +447,82 @@ class BodyDetector:
     
     def get_facial_regions(self, face_mesh):
         """Extract specific facial regions for detailed analysis with CORRECT indices"""
-        if not face_mesh or 'landmarks' not in face_mesh:
+        if not face_mesh or 'landmarks_xy' not in face_mesh:
             return {}
             
-        landmarks = face_mesh['landmarks']
-        
-        # Correct MediaPipe Face Mesh indices
-        regions = {
-            'left_eye': [33, 7, 163, 144, 145, 153, 154, 155, 133, 173, 157, 158, 159, 160, 161, 246],
-            'right_eye': [362, 382, 381, 380, 374, 373, 390, 249, 263, 466, 388, 387, 386, 385, 384, 398],
-            'left_eyebrow': [70, 63, 105, 66, 107, 55, 65, 52, 53, 46],
-            'right_eyebrow': [300, 293, 334, 296, 336, 285, 295, 282, 283, 276],
-            'mouth_outer': [61, 146, 91, 181, 84, 17, 314, 405, 320, 307, 375, 321, 308, 324, 318, 402, 317, 14, 87, 178, 88, 95],
-            'mouth_inner': [78, 95, 88, 178, 87, 14, 317, 402, 318, 324, 308, 415, 310, 311, 312, 13, 82, 81, 80, 191],
-            'nose_tip': [1, 2, 98, 327],
-            'nose_bridge': [168, 6, 197, 195, 5, 4],
-            'face_oval': [10, 338, 297, 332, 284, 251, 389, 356, 454, 323, 361, 288, 397, 365, 379, 378, 400, 377, 152, 148, 176, 149, 150, 136, 172, 58, 132, 93, 234, 127, 162, 21, 54, 103, 67, 109]
-        }
+        landmarks = face_mesh['landmarks_xy']
+        if len(landmarks) <= self._max_region_index:
+            return {}
         
-        facial_regions = {}
-        for region_name, indices in regions.items():
-            points = []
-            for idx in indices:
-                if idx < len(landmarks):
-                    points.append((landmarks[idx]['x'], landmarks[idx]['y']))
-            facial_regions[region_name] = points
-            
-        return facial_regions
+        # Single gather per region into (K, 2) int32 point arrays
+        return {name: landmarks[indices] for name, indices in self._region_indices.items()}
+    
+    def set_profile(self, profile):
+        """Switch accuracy profile between frames, recreating the MediaPipe graphs"""
+        if profile not in self.ACCURACY_PROFILES:
+            raise ValueError(f"Unknown accuracy profile: {profile}")
+        if profile == self.profile:
+            return
+        
+        old_complexity, old_refine = self.ACCURACY_PROFILES[self.profile]
+        complexity, refine_landmarks = self.ACCURACY_PROFILES[profile]
+        self.profile = profile
+        
+        # Graphs only run inside analyze(), so none is busy between frames.
+        # Only graphs whose settings change are rebuilt; the rest keep tracking.
+        if self.use_holistic:
+            self.holistic.close()
+            self._create_graphs(self.static, complexity, refine_landmarks)
+            return
+        if complexity != old_complexity:
+            self.pose.close()
+            self.pose = self._build_pose(self.static, complexity)
+        if min(complexity, 1) != min(old_complexity, 1):
+            self.hands.close()
+            self.hands = self._build_hands(self.static, complexity)
+        if refine_landmarks != old_refine:
+            self.face_mesh.close()
+            self.face_mesh = self._build_face_mesh(self.static, refine_landmarks)
+    
+    def close(self):
+        """Release the worker pool and MediaPipe graphs"""
+        self._pool.shutdown(wait=True)
+        self._close_graphs()
+    
+    def _close_graphs(self):
+        """Close whichever MediaPipe graphs are active"""
+        if self.use_holistic:
+            self.holistic.close()
+            return
+        for attr in self._GRAPH_ATTRS.values():
+            getattr(self, attr).close()
     
     def draw_detections(self, image, faces, pose_landmarks, hand_landmarks_list, face_meshes=None):
         """Draw all detections on the image with enhanced visualization"""
         # Draw face meshes with detailed landmarks
-        if face_meshes:
+        if face_meshes and self.draw_detail != 'none':
             for face_mesh in face_meshes:
                 if 'mesh' in face_mesh:
-                    self.mp_draw.draw_landmarks(
-                        image=image,
-                        landmark_list=face_mesh['mesh'],
-                        connections=self.face_mesh_connections,
-                        landmark_drawing_spec=self.face_mesh_drawing_spec,
-                        connection_drawing_spec=self.face_mesh_drawing_spec
-                    )
+                    # The 468-point tesselation is the costliest overlay, so
+                    # 'contours' mode draws only the region outlines below
+                    if self.draw_detail == 'mesh':
+                        self.mp_draw.draw_landmarks(
+                            image=image,
+                            landmark_list=face_mesh['mesh'],
+                            connections=self.face_mesh_connections,
+                            landmark_drawing_spec=self.face_mesh_drawing_spec,
+                            connection_drawing_spec=self.face_mesh_drawing_spec
+                        )
                     
-                    # Draw facial regions
+                    # Draw all facial regions with a single batched call
                     facial_regions = self.get_facial_regions(face_mesh)
-                    for region_name, points in facial_regions.items():
-                        if len(points) > 2:
-                            pts = np.array(points, np.int32)
-                            pts = pts.reshape((-1, 1, 2))
-                            cv2.polylines(image, [pts], isClosed=True, 
-                                        color=(255, 255, 0), thickness=1)
+                    contours = [
+                        points.reshape((-1, 1, 2))
+                        for points in facial_regions.values() if len(points) > 2
+                    ]
+                    if contours:
+                        cv2.polylines(image, contours, isClosed=True, 
+                                    color=(255, 255, 0), thickness=1)
         
         # Draw basic face bounding boxes
         for face in faces:
@@ -234,8 +533,7 @@ class BodyDetector:
         if pose_landmarks:
             self.mp_draw.draw_landmarks(
                 image, pose_landmarks, self.mp_pose.POSE_CONNECTIONS,
-                self.mp_draw.DrawingSpec(color=(0, 255, 0), thickness=3, circle_radius=3),
-                self.mp_draw.DrawingSpec(color=(0, 255, 0), thickness=3)
+                self._pose_point_spec, self._pose_conn_spec
             )
             
         # Draw hands with detailed landmarks
@@ -243,8 +541,7 @@ class BodyDetector:
             for hand_landmarks in hand_landmarks_list:
                 self.mp_draw.draw_landmarks(
                     image, hand_landmarks, self.mp_hands.HAND_CONNECTIONS,
-                    self.mp_draw.DrawingSpec(color=(0, 0, 255), thickness=3, circle_radius=3),
-                    self.mp_draw.DrawingSpec(color=(0, 0, 255), thickness=3)
+                    self._hand_point_spec, self._hand_conn_spec
                 )
                 
         return image
\ No newline at end of file
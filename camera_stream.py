@@ -0,0 +1,118 @@
+import cv2
+import threading
+import numpy as np
+from queue import Queue, Empty, Full
+
+class CameraStream:
+    def __init__(self, cap, mirror=False, drop_frames=True, queue_size=4):
+        self.cap = cap
+        self.mirror = mirror
+        # Live cameras: a single slot, so the consumer always gets the newest frame
+        # and stale ones are dropped. Files: a small decode-ahead queue that blocks
+        # the reader instead, so every frame is processed exactly once, in order.
+        self.drop_frames = drop_frames
+        self.frame_queue = Queue(maxsize=1 if drop_frames else queue_size)
+        self.is_running = False
+        self.thread = None
+        
+    def start(self, first_frame=None):
+        """Start the background capture thread, optionally queueing an already-read frame first"""
+        self.is_running = True
+        if first_frame is not None:
+            self.frame_queue.put(self._prepare(first_frame))
+        self.thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self.thread.start()
+        return self
+        
+    def _capture_loop(self):
+        """Continuously read frames, dropping or waiting on frames not yet consumed"""
+        while self.is_running:
+            ret, frame = self.cap.read()
+            if ret:
+                frame = self._prepare(frame)
+            
+            # Only this thread puts, so after dropping the stale frame put() cannot block
+            if self.drop_frames and self.frame_queue.full():
+                try:
+                    self.frame_queue.get_nowait()
+                except Empty:
+                    pass
+            
+            # None tells the consumer the camera stopped delivering frames
+            if not self._put(frame if ret else None) or not ret:
+                break
+                
+    def _prepare(self, frame):
+        """Make the frame contiguous and mirror it if requested"""
+        # Downstream SIMD color conversion needs a contiguous buffer
+        if not frame.flags['C_CONTIGUOUS']:
+            frame = np.ascontiguousarray(frame)
+        
+        # Flip horizontally for mirror effect here, off the processing thread
+        if self.mirror:
+            frame = cv2.flip(frame, 1)
+        return frame
+        
+    def _put(self, frame):
+        """Queue a frame, waiting for space without missing a stop(); False if stopped"""
+        while self.is_running:
+            try:
+                self.frame_queue.put(frame, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+                
+    def read(self, timeout=1.0):
+        """Get the newest frame as (ret, frame), like cv2.VideoCapture.read()"""
+        try:
+            frame = self.frame_queue.get(timeout=timeout)
+        except Empty:
+            return False, None
+        return frame is not None, frame
+        
+    def stop(self):
+        """Stop the capture thread"""
+        self.is_running = False
+        if self.thread:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+
+
+class CudaVideoReader:
+    def __init__(self, source, mirror=False):
+        self.reader = cv2.cudacodec.createVideoReader(source)
+        self.mirror = mirror
+        
+    @classmethod
+    def open(cls, source, mirror=False):
+        """Create an NVDEC-backed reader, or return None when CUDA decoding is unavailable"""
+        if not hasattr(cv2, 'cudacodec') or cv2.cuda.getCudaEnabledDeviceCount() == 0:
+            return None
+        try:
+            return cls(source, mirror)
+        except cv2.error as e:
+            print(f"GPU video decoding unavailable: {e}")
+            return None
+        
+    def isOpened(self):
+        """Match cv2.VideoCapture; construction fails instead of opening closed"""
+        return True
+        
+    def read(self):
+        """Decode and mirror on the GPU, downloading only the finished frame"""
+        ret, gpu_frame = self.reader.nextFrame()
+        if not ret:
+            return False, None
+        if self.mirror:
+            gpu_frame = cv2.cuda.flip(gpu_frame, 1)
+        frame = gpu_frame.download()
+        
+        # NVDEC delivers BGRA; the detectors expect BGR
+        if frame.ndim == 3 and frame.shape[2] == 4:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+        return True, frame
+        
+    def release(self):
+        """Release the GPU decoder"""
+        self.reader = None
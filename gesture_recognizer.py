@@ -1,146 +1,116 @@
 import numpy as np
-from config.settings import GESTURES
+from config.settings import GESTURES, HAND_CONFIDENCE
+from jit_utils import njit
+
+# Gesture ids returned by classify_gesture, indexing GESTURE_NAMES
+GESTURE_NAMES = (
+    "fist", "open_hand", "victory", "pointing", "thumbs_up", "thumbs_down",
+    "three_fingers", "four_fingers", "ok", "rock", "pinch", "unknown"
+)
+(FIST, OPEN_HAND, VICTORY, POINTING, THUMBS_UP, THUMBS_DOWN,
+ THREE_FINGERS, FOUR_FINGERS, OK, ROCK, PINCH, UNKNOWN) = range(len(GESTURE_NAMES))
+
+# Pixel distance thresholds, squared so distance checks never need a sqrt
+VICTORY_MIN_SPREAD_SQ = 20 ** 2
+OK_MAX_DIST_SQ = 25 ** 2
+PINCH_MIN_DIST_SQ = 10 ** 2
+PINCH_MAX_DIST_SQ = 35 ** 2
+
+@njit(cache=True)
+def _sq_dist(lm, i, j):
+    """Squared pixel distance between landmarks i and j"""
+    dx = lm[i, 0] - lm[j, 0]
+    dy = lm[i, 1] - lm[j, 1]
+    return dx * dx + dy * dy
+
+@njit(cache=True)
+def classify_gesture(lm):
+    """Classify a (21, 2) int32 hand landmark array into (gesture_id, confidence)"""
+    # Thumb is extended if tip (4) is to the left of IP joint (3) (for right hand)
+    thumb = lm[4, 0] < lm[3, 0] - 5
+    
+    # A finger is extended if its tip (8, 12, 16, 20) is above its MCP joint
+    # (5, 9, 13, 17), i.e. has a lower y value
+    index = lm[8, 1] < lm[5, 1] - 10
+    middle = lm[12, 1] < lm[9, 1] - 10
+    ring = lm[16, 1] < lm[13, 1] - 10
+    pinky = lm[20, 1] < lm[17, 1] - 10
+    count_extended = int(index) + int(middle) + int(ring) + int(pinky)
+    
+    # Thumb tip (4) to index tip (8), shared by the OK and pinch checks
+    thumb_index_sq = _sq_dist(lm, 4, 8)
+    
+    # REORDERED CONDITIONS - Most specific first
+    
+    # Fist - NO fingers extended (including thumb)
+    if not thumb and count_extended == 0:
+        return FIST, 0.95
+    
+    # Open hand - ALL fingers extended
+    elif thumb and count_extended == 4:
+        return OPEN_HAND, 0.92
+    
+    # Victory - ONLY index and middle extended
+    elif index and middle and not ring and not pinky:
+        # Additional check: ensure fingers are separated
+        if _sq_dist(lm, 8, 12) > VICTORY_MIN_SPREAD_SQ:
+            return VICTORY, 0.93
+    
+    # Pointing - ONLY index extended
+    elif index and not middle and not ring and not pinky:
+        return POINTING, 0.90
+    
+    # Thumbs up / down - ONLY thumb extended; orientation decides which:
+    # thumb tip well below the wrist (0) is thumbs down
+    elif thumb and count_extended == 0:
+        if lm[4, 1] > lm[0, 1] + 50:
+            return THUMBS_DOWN, 0.94
+        return THUMBS_UP, 0.94
+    
+    # Three fingers - index, middle, ring
+    elif index and middle and ring and not pinky:
+        return THREE_FINGERS, 0.88
+    
+    # Four fingers - all except thumb
+    elif not thumb and count_extended == 4:
+        return FOUR_FINGERS, 0.86
+    
+    # OK gesture - thumb and index tips touching
+    elif thumb_index_sq < OK_MAX_DIST_SQ:
+        return OK, 0.89
+    
+    # Rock - thumb and pinky
+    elif thumb and pinky and not index and not middle and not ring:
+        return ROCK, 0.87
+    
+    # Pinch gesture - thumb and index tips close but not touching
+    elif PINCH_MIN_DIST_SQ < thumb_index_sq < PINCH_MAX_DIST_SQ:
+        return PINCH, 0.85
+    
+    return UNKNOWN, 0.3
 
 class GestureRecognizer:
     def __init__(self):
         self.gestures = GESTURES
+        # Compile (or load from cache) the kernel now rather than on the first hand
+        classify_gesture(np.zeros((21, 2), dtype=np.int32))
         
     def recognize_gesture(self, hand_data):
         """Improved gesture recognition with better logic"""
-        if not hand_data or 'landmarks' not in hand_data:
+        if not hand_data or 'landmarks_xy' not in hand_data:
             return "unknown", 0.0
-            
-        hand_landmarks = hand_data['landmarks']
         
-        if len(hand_landmarks) < 21:
+        # Hands carries no per-hand detection score; handedness probability (>= 0.5)
+        # stands in for it, so ambiguous hands below HAND_CONFIDENCE are skipped
+        if hand_data.get('score', 1.0) < HAND_CONFIDENCE:
             return "unknown", 0.0
             
-        # Get finger states
-        finger_states = self._analyze_finger_states(hand_landmarks)
-        
-        # Analyze gestures
-        gesture, confidence = self._analyze_gestures(hand_landmarks, finger_states)
-        
-        return gesture, confidence
-    
-    def _analyze_finger_states(self, landmarks):
-        """Analyze which fingers are extended - SIMPLIFIED AND CORRECTED"""
-        fingers = {}
-        
-        # Finger tip indices
-        thumb_tip = 4
-        index_tip = 8
-        middle_tip = 12
-        ring_tip = 16
-        pinky_tip = 20
-        
-        # Finger MCP joints (base)
-        index_mcp = 5
-        middle_mcp = 9
-        ring_mcp = 13
-        pinky_mcp = 17
-        
-        # SIMPLIFIED FINGER DETECTION
-        # A finger is extended if tip is above MCP (lower y value)
-        fingers['thumb'] = self._is_thumb_extended(landmarks)
-        fingers['index'] = landmarks[index_tip]['y'] < landmarks[index_mcp]['y'] - 10
-        fingers['middle'] = landmarks[middle_tip]['y'] < landmarks[middle_mcp]['y'] - 10
-        fingers['ring'] = landmarks[ring_tip]['y'] < landmarks[ring_mcp]['y'] - 10
-        fingers['pinky'] = landmarks[pinky_tip]['y'] < landmarks[pinky_mcp]['y'] - 10
-            
-        return fingers
-    
-    def _is_thumb_extended(self, landmarks):
-        """Check if thumb is extended"""
-        thumb_tip = 4
-        thumb_ip = 3
-        thumb_mcp = 2
-        
-        # Thumb is extended if tip is to the left of IP joint (for right hand)
-        return landmarks[thumb_tip]['x'] < landmarks[thumb_ip]['x'] - 5
-    
-    def _analyze_gestures(self, landmarks, finger_states):
-        """CLEANED UP gesture analysis with non-conflicting conditions"""
-        thumb = finger_states['thumb']
-        index = finger_states['index']
-        middle = finger_states['middle']
-        ring = finger_states['ring']
-        pinky = finger_states['pinky']
-        
-        extended_fingers = [index, middle, ring, pinky]
-        count_extended = sum(extended_fingers)
-        
-        # REORDERED CONDITIONS - Most specific first
-        
-        # Fist - NO fingers extended (including thumb)
-        if not thumb and count_extended == 0:
-            return "fist", 0.95
-        
-        # Open hand - ALL fingers extended
-        elif thumb and count_extended == 4:
-            return "open_hand", 0.92
-        
-        # Victory - ONLY index and middle extended
-        elif index and middle and not ring and not pinky:
-            # Additional check: ensure fingers are separated
-            if self._calculate_distance(landmarks[8], landmarks[12]) > 20:
-                return "victory", 0.93
-        
-        # Pointing - ONLY index extended
-        elif index and not middle and not ring and not pinky:
-            return "pointing", 0.90
+        hand_landmarks = hand_data['landmarks_xy']
         
-        # Thumbs up - ONLY thumb extended
-        elif thumb and count_extended == 0:
-            return "thumbs_up", 0.94
-        
-        # Thumbs down - thumb extended with fist (special case)
-        elif thumb and count_extended == 0:
-            # Check orientation for thumbs down
-            wrist = landmarks[0]
-            if landmarks[4]['y'] > wrist['y'] + 50:
-                return "thumbs_down", 0.94
-        
-        # Three fingers - index, middle, ring
-        elif index and middle and ring and not pinky:
-            return "three_fingers", 0.88
-        
-        # Four fingers - all except thumb
-        elif not thumb and count_extended == 4:
-            return "four_fingers", 0.86
-        
-        # OK gesture
-        elif self._is_ok_gesture(landmarks):
-            return "ok", 0.89
-        
-        # Rock - thumb and pinky
-        elif thumb and pinky and not index and not middle and not ring:
-            return "rock", 0.87
-        
-        # Pinch gesture
-        elif self._is_pinching(landmarks):
-            return "pinch", 0.85
-        
-        else:
-            return "unknown", 0.3
-    
-    def _is_ok_gesture(self, landmarks):
-        """Check for OK gesture"""
-        thumb_tip = landmarks[4]
-        index_tip = landmarks[8]
+        if len(hand_landmarks) < 21:
+            return "unknown", 0.0
         
-        distance = self._calculate_distance(thumb_tip, index_tip)
-        return distance < 25
-    
-    def _is_pinching(self, landmarks):
-        """Check for pinching gesture"""
-        thumb_tip = landmarks[4]
-        index_tip = landmarks[8]
+        # Finger states and the gesture decision tree run as one compiled kernel
+        gesture_id, confidence = classify_gesture(hand_landmarks)
         
-        distance = self._calculate_distance(thumb_tip, index_tip)
-        return 10 < distance < 35
-    
-    def _calculate_distance(self, point1, point2):
-        """Calculate Euclidean distance between two points"""
-        return np.sqrt((point1['x'] - point2['x'])**2 + 
-                      (point1['y'] - point2['y'])**2)
\ No newline at end of file
+        return GESTURE_NAMES[gesture_id], confidence
\ No newline at end of file
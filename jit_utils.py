@@ -0,0 +1,10 @@
+# Optional Numba support: hot numeric kernels are compiled when Numba is
+# installed and run as plain Python otherwise.
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
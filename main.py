@@ -1,29 +1,92 @@
 import cv2
 import time
+import logging
+import argparse
+import threading
 import numpy as np
 from datetime import datetime
+from queue import Queue, Empty, Full
 
 from body_detector import BodyDetector
+from camera_stream import CameraStream, CudaVideoReader
 from emotion_detector import EmotionDetector
 from gesture_recognizer import GestureRecognizer
+from jit_utils import njit
 from video_processor import VideoProcessor
 
+@njit(cache=True)
+def clamp_bbox(x, y, w, h, frame_w, frame_h):
+    """Clip an (x, y, w, h) box to the frame; w or h <= 0 means it lies outside"""
+    x = max(0, x)
+    y = max(0, y)
+    return x, y, min(w, frame_w - x), min(h, frame_h - y)
+
 class HumanAnalysisSystem:
-    def __init__(self):
-        self.body_detector = BodyDetector()
+    def __init__(self, source=1, holistic=False):
+        # Camera index, or a video file/stream path for GPU-decodable input
+        self.source = source
+        
+        # Lite pose/hands models keep the real-time path responsive
+        self.body_detector = BodyDetector(profile='fast', holistic=holistic)
         self.emotion_detector = EmotionDetector()
         self.gesture_recognizer = GestureRecognizer()
         self.video_processor = VideoProcessor()
         
+        # Compile the JIT helpers now so the cost is not paid on the first frame
+        clamp_bbox(0, 0, 1, 1, 1, 1)
+        
         self.cap = None
+        self.camera_stream = None
         self.is_running = False
+        # Frame size reported by the source, probed once in initialize_camera
+        self.frame_size = None
+        
+        # The display thread owns imshow/waitKey: it shows the newest processed
+        # frame, sets stop_event on 'q' and forwards other keys to the main loop
+        self.display_queue = Queue(maxsize=1)
+        self.key_queue = Queue()
+        self.stop_event = threading.Event()
+        self.display_thread = None
+        
+        # Frame-to-frame reuse: near-static frames (mean thumbnail difference
+        # below static_threshold) reuse cached results, and pose/hands only
+        # run every detect_interval analyzed frames
+        self.static_threshold = 2.0
+        self.detect_interval = 3
+        self._frame_index = 0
+        self._prev_thumbnail = None
+        self._cache = None
+        
+        # Adaptive accuracy: step the detector profile down while the detection
+        # latency average stays over budget, and back up (to max_profile) once
+        # there is headroom again
+        self.latency_budget = 0.033
+        self.latency_headroom = 0.020
+        self.max_profile = 'balanced'
+        self._profiles = list(BodyDetector.ACCURACY_PROFILES)
+        self._latency_ewma = 0.0
+        self._slow_frames = 0
+        self._fast_frames = 0
+        # Fast frames needed before stepping up; doubles after every step down so
+        # a profile that just failed its budget is not retried right away
+        self._step_up_frames = 60
         
     def initialize_camera(self):
         """Initialize camera"""
-        self.cap = cv2.VideoCapture(1, cv2.CAP_DSHOW)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-        self.cap.set(cv2.CAP_PROP_FPS, 30)
+        mirror_on_cpu = True
+        if isinstance(self.source, int):
+            self.cap = cv2.VideoCapture(self.source, cv2.CAP_DSHOW)
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+            self.cap.set(cv2.CAP_PROP_FPS, 30)
+        else:
+            # Files/streams decode and mirror on the GPU (NVDEC) when available;
+            # cudacodec cannot open webcams, so those stay on VideoCapture
+            self.cap = CudaVideoReader.open(self.source, mirror=True)
+            if self.cap is not None:
+                mirror_on_cpu = False
+            else:
+                self.cap = cv2.VideoCapture(self.source)
         
         if not self.cap.isOpened():
             print("Error: Could not open camera")
@@ -34,112 +97,165 @@ class HumanAnalysisSystem:
         if not ret:
             print("Error: Could not read from camera")
             return False
+        
+        # The source delivers a fixed size (1280x720 was only requested), so size
+        # the detector's scratch buffers from the probe frame instead of per frame
+        self.frame_size = (test_frame.shape[1], test_frame.shape[0])
+        self.body_detector.allocate_buffers(test_frame.shape)
+            
+        # Capture and mirror on a background thread; recording is encoded on
+        # VideoProcessor's writer thread. A live source drops stale frames so
+        # processing always sees the newest one, while a file must not skip
+        # content: its frames queue losslessly, starting with the probe frame.
+        # Network streams (rtsp://, http://, ...) are live too.
+        live = isinstance(self.source, int) or '://' in self.source
+        self.camera_stream = CameraStream(self.cap, mirror=mirror_on_cpu, drop_frames=live).start(
+            first_frame=None if live else test_frame
+        )
             
         print("Camera initialized successfully")
         return True
 
     def process_frame(self, frame):
         """Process a single frame for enhanced analysis"""
-        try:
-            # Detect components with enhanced features - with error handling
-            faces = self.body_detector.detect_face(frame)
-            pose_landmarks, pose_data = self.body_detector.detect_pose(frame)
-            
-            # FIXED: Handle hand detection properly to avoid unpacking errors
-            hands_result = self.body_detector.detect_hands(frame)
-            if hands_result is None:
-                hands_data, hand_landmarks = [], None
-            else:
-                hands_data, hand_landmarks = hands_result
-                
-            face_meshes = self.body_detector.detect_face_mesh(frame)
+        # Errors propagate to run(), which logs them and shows the raw frame
+        
+        # Reuse the last results while the scene barely differs from the
+        # last analyzed frame; only the overlay is redrawn
+        thumbnail = self._thumbnail(frame)
+        if (self._cache is not None and
+                cv2.absdiff(thumbnail, self._prev_thumbnail).mean() < self.static_threshold):
+            detections = self._cache
+        else:
+            # Only frames that ran detection inform the latency controller;
+            # cache hits just redraw and would make any profile look cheap
+            start_time = time.perf_counter()
+            detections = self._detect(frame)
+            self._adapt_profile(time.perf_counter() - start_time)
+            self._cache = detections
+            self._prev_thumbnail = thumbnail
+        
+        frame = self._draw(frame, detections)
+        return frame, detections['emotions'], detections['gestures']
+    
+    def _thumbnail(self, frame):
+        """Small grayscale copy of the frame for cheap change detection"""
+        small = cv2.resize(frame, (160, 90), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    
+    def _detect(self, frame):
+        """Run detection, emotion and gesture analysis on a frame"""
+        # Pose and hands only run every detect_interval analyzed frames; Holistic
+        # computes them with the face anyway, so its fresh results are always kept
+        run_body = (self._cache is None or self.body_detector.use_holistic or
+                    self._frame_index % self.detect_interval == 0)
+        self._frame_index += 1
+        
+        # Run the MediaPipe graphs once on a shared RGB conversion
+        analysis = self.body_detector.analyze(frame, body=run_body)
+        if not run_body:
+            cached = self._cache['analysis']
+            analysis['pose'], analysis['hands'] = cached['pose'], cached['hands']
+        
+        # Detect components with enhanced features - with error handling
+        faces = self.body_detector.detect_face(frame, analysis)
+        pose_landmarks, pose_data = self.body_detector.detect_pose(frame, analysis)
+        
+        # FIXED: Handle hand detection properly to avoid unpacking errors
+        hands_result = self.body_detector.detect_hands(frame, analysis)
+        if hands_result is None:
+            hands_data, hand_landmarks = [], None
+        else:
+            hands_data, hand_landmarks = hands_result
             
-            # Initialize emotions and gestures lists
-            emotions = []
-            gestures = []
+        face_meshes = self.body_detector.detect_face_mesh(frame, analysis)
+        
+        # Initialize emotions and gestures lists, plus where to draw each emotion
+        emotions = []
+        emotion_boxes = []
+        gestures = []
+        frame_h, frame_w = frame.shape[:2]
+        
+        # Analyze emotions for each face - only process first face
+        if face_meshes:
+            # Only use the first face mesh to avoid multiple detections
+            face_mesh = face_meshes[0]
+            x, y, w, h = clamp_bbox(*face_mesh['bbox'], frame_w, frame_h)
             
-            # Analyze emotions for each face - only process first face
-            if face_meshes:
-                # Only use the first face mesh to avoid multiple detections
-                face_mesh = face_meshes[0]
-                x, y, w, h = face_mesh['bbox']
+            if w > 0 and h > 0:  # Only process if valid ROI
+                face_roi = frame[y:y+h, x:x+w]
                 
-                # Ensure ROI coordinates are within frame bounds
-                x = max(0, x)
-                y = max(0, y)
-                w = min(w, frame.shape[1] - x)
-                h = min(h, frame.shape[0] - y)
+                # Enhanced emotion detection with facial landmarks
+                emotion, confidence = self.emotion_detector.detect_emotion(face_roi, face_mesh)
+                emotions.append((emotion, confidence))
                 
-                if w > 0 and h > 0:  # Only process if valid ROI
-                    face_roi = frame[y:y+h, x:x+w]
-                    
-                    # Enhanced emotion detection with facial landmarks
-                    emotion, confidence = self.emotion_detector.detect_emotion(face_roi, face_mesh)
-                    emotions.append((emotion, confidence))
-                    
-                    # Get facial regions for detailed drawing
-                    facial_regions = self.body_detector.get_facial_regions(face_mesh)
-                    
-                    # Display enhanced emotion info
-                    frame = self.emotion_detector.draw_emotion_info(
-                        frame, (x, y, w, h), emotion, confidence, facial_regions
-                    )
+                # Get facial regions for detailed drawing
+                facial_regions = self.body_detector.get_facial_regions(face_mesh)
+                emotion_boxes.append(((x, y, w, h), facial_regions))
+        
+        # Fallback for basic face detection if no face mesh found
+        elif faces:
+            # Only process the first face
+            face = faces[0]
+            x, y, w, h = clamp_bbox(*face['bbox'], frame_w, frame_h)
             
-            # Fallback for basic face detection if no face mesh found
-            elif faces:
-                # Only process the first face
-                face = faces[0]
-                x, y, w, h = face['bbox']
-                
-                # Ensure ROI coordinates are within frame bounds
-                x = max(0, x)
-                y = max(0, y)
-                w = min(w, frame.shape[1] - x)
-                h = min(h, frame.shape[0] - y)
+            if w > 0 and h > 0:  # Only process if valid ROI
+                face_roi = frame[y:y+h, x:x+w]
                 
-                if w > 0 and h > 0:  # Only process if valid ROI
-                    face_roi = frame[y:y+h, x:x+w]
-                    
-                    emotion, confidence = self.emotion_detector.detect_emotion(face_roi)
-                    emotions.append((emotion, confidence))
-                    
-                    frame = self.emotion_detector.draw_emotion_info(
-                        frame, (x, y, w, h), emotion, confidence
-                    )
-            
-            # Analyze gestures for each hand with enhanced recognition
-            if hands_data:
-                for i, hand in enumerate(hands_data):
-                    gesture, confidence = self.gesture_recognizer.recognize_gesture(hand)
-                    gestures.append((gesture, confidence))
-                    
-                    # Display enhanced gesture info
-                    if hand and hand['landmarks']:
-                        wrist = hand['landmarks'][0]
-                        text = f"{gesture} ({confidence:.2f})"
-                        cv2.putText(frame, text, (wrist['x'], wrist['y']-20), 
-                                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
-            
-            # Draw all enhanced detections
-            frame = self.body_detector.draw_detections(
-                frame, faces, pose_data, hand_landmarks, face_meshes
-            )
-            
-            # Calculate face count properly
-            face_count = len(face_meshes) if face_meshes else len(faces)
-            pose_detected = pose_landmarks is not None and len(pose_landmarks) > 0
-            
-            # Add analysis information overlay
-            frame = self.video_processor.draw_analysis_info(
-                frame, emotions, gestures, pose_detected, face_count
+                emotion, confidence = self.emotion_detector.detect_emotion(face_roi)
+                emotions.append((emotion, confidence))
+                emotion_boxes.append(((x, y, w, h), None))
+        
+        # Analyze gestures for each hand with enhanced recognition
+        for hand in hands_data:
+            gestures.append(self.gesture_recognizer.recognize_gesture(hand))
+        
+        return {
+            'analysis': analysis,
+            'faces': faces,
+            'face_meshes': face_meshes,
+            'pose_landmarks': pose_landmarks,
+            'pose_data': pose_data,
+            'hands_data': hands_data,
+            'hand_landmarks': hand_landmarks,
+            'emotions': emotions,
+            'emotion_boxes': emotion_boxes,
+            'gestures': gestures
+        }
+    
+    def _draw(self, frame, detections):
+        """Draw detection results and the analysis overlay onto the frame"""
+        # Display enhanced emotion info
+        for (bbox, facial_regions), (emotion, confidence) in zip(
+                detections['emotion_boxes'], detections['emotions']):
+            frame = self.emotion_detector.draw_emotion_info(
+                frame, bbox, emotion, confidence, facial_regions
             )
-            
-            return frame, emotions, gestures
-            
-        except Exception as e:
-            print(f"Error in process_frame: {e}")
-            # Return the original frame with empty emotions and gestures
-            return frame, [], []
+        
+        # Display enhanced gesture info
+        for hand, (gesture, confidence) in zip(detections['hands_data'], detections['gestures']):
+            if hand and len(hand['landmarks_xy']):
+                wrist_x, wrist_y = hand['landmarks_xy'][0].tolist()
+                text = f"{gesture} ({confidence:.2f})"
+                cv2.putText(frame, text, (wrist_x, wrist_y-20), 
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
+        
+        # Draw all enhanced detections
+        faces = detections['faces']
+        face_meshes = detections['face_meshes']
+        frame = self.body_detector.draw_detections(
+            frame, faces, detections['pose_data'], detections['hand_landmarks'], face_meshes
+        )
+        
+        # Calculate face count properly
+        face_count = len(face_meshes) if face_meshes else len(faces)
+        pose_landmarks = detections['pose_landmarks']
+        pose_detected = pose_landmarks is not None and len(pose_landmarks) > 0
+        
+        # Add analysis information overlay
+        return self.video_processor.draw_analysis_info(
+            frame, detections['emotions'], detections['gestures'], pose_detected, face_count
+        )
 
     def run(self):
         """Main application loop"""
@@ -150,25 +266,25 @@ class HumanAnalysisSystem:
         print("Starting Human Analysis System...")
         print("Press 'q' to quit, 'r' to start/stop recording, 's' to save screenshot")
         
-        while self.is_running:
-            ret, frame = self.cap.read()
+        self.display_thread = threading.Thread(target=self._display_loop, daemon=True)
+        self.display_thread.start()
+        
+        while self.is_running and not self.stop_event.is_set():
+            ret, frame = self.camera_stream.read()
             if not ret:
                 print("Error: Could not read frame")
                 break
             
-            # Flip frame horizontally for mirror effect
-            frame = cv2.flip(frame, 1)
-            
             # Process frame
             try:
                 processed_frame, emotions, gestures = self.process_frame(frame)
-            except Exception as e:
-                print(f"Error processing frame: {e}")
+            except Exception:
+                logging.exception("Error processing frame")
                 processed_frame = frame
                 emotions = []
                 gestures = []
             
-            # Record frame if recording
+            # Queue frame for the writer thread if recording
             self.video_processor.write_frame(processed_frame)
             
             # Display recording status
@@ -176,19 +292,23 @@ class HumanAnalysisSystem:
                 cv2.putText(processed_frame, "RECORDING", (10, processed_frame.shape[0]-10), 
                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
             
-            # Display frame
-            cv2.imshow('AI Human Analysis System', processed_frame)
+            # Hand the frame to the display thread; drop it if the last one is still pending
+            try:
+                self.display_queue.put_nowait(processed_frame)
+            except Full:
+                pass
             
-            # Handle key presses
-            key = cv2.waitKey(1) & 0xFF
-            if key == ord('q'):
-                break
-            elif key == ord('r'):
+            # Handle key presses forwarded by the display thread
+            try:
+                key = self.key_queue.get_nowait()
+            except Empty:
+                continue
+            if key == ord('r'):
                 if not self.video_processor.recording:
                     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    output_path = f"output/recordings/analysis_{timestamp}.avi"
-                    self.video_processor.start_recording(output_path, 
-                                                       (processed_frame.shape[1], processed_frame.shape[0]))
+                    extension = self.video_processor.file_extension
+                    output_path = f"output/recordings/analysis_{timestamp}.{extension}"
+                    self.video_processor.start_recording(output_path, self.frame_size)
                     print(f"Started recording: {output_path}")
                 else:
                     self.video_processor.stop_recording()
@@ -202,15 +322,73 @@ class HumanAnalysisSystem:
         # Cleanup
         self.cleanup()
         
+    def _adapt_profile(self, latency):
+        """Trade detector accuracy for speed based on the smoothed detection latency"""
+        self._latency_ewma = 0.9 * self._latency_ewma + 0.1 * latency
+        
+        if self._latency_ewma > self.latency_budget:
+            self._slow_frames += 1
+            self._fast_frames = 0
+        elif self._latency_ewma < self.latency_headroom:
+            self._fast_frames += 1
+            self._slow_frames = 0
+        else:
+            self._slow_frames = self._fast_frames = 0
+        
+        level = self._profiles.index(self.body_detector.profile)
+        if self._slow_frames >= 30 and level > 0:
+            level -= 1
+            self._step_up_frames = min(self._step_up_frames * 2, 3840)
+        elif (self._fast_frames >= self._step_up_frames and
+                level < self._profiles.index(self.max_profile)):
+            level += 1
+        else:
+            return
+        
+        self.body_detector.set_profile(self._profiles[level])
+        self._slow_frames = self._fast_frames = 0
+        print(f"Latency {self._latency_ewma * 1000:.1f} ms, switched to '{self._profiles[level]}' profile")
+        
+    def _display_loop(self):
+        """Show processed frames and poll keys off the processing thread"""
+        while not self.stop_event.is_set():
+            try:
+                frame = self.display_queue.get(timeout=0.1)
+            except Empty:
+                continue
+            cv2.imshow('AI Human Analysis System', frame)
+            
+            key = cv2.waitKey(1) & 0xFF
+            if key == ord('q'):
+                self.stop_event.set()
+            elif key != 0xFF:
+                self.key_queue.put(key)
+        # HighGUI windows belong to the thread that created them
+        cv2.destroyAllWindows()
+        
     def cleanup(self):
         """Clean up resources"""
+        self.stop_event.set()
+        if self.display_thread:
+            self.display_thread.join(timeout=1.0)
+            self.display_thread = None
+        if self.camera_stream:
+            self.camera_stream.stop()
         if self.cap:
             self.cap.release()
         if self.video_processor.recording:
             self.video_processor.stop_recording()
-        cv2.destroyAllWindows()
+        self.body_detector.close()
         print("System shutdown complete")
 
 if __name__ == "__main__":
-    system = HumanAnalysisSystem()
+    parser = argparse.ArgumentParser(description="AI Human Analysis System")
+    parser.add_argument('--source', default='1',
+                        help="camera index, or a video file/stream path (default: 1)")
+    parser.add_argument('--holistic', action='store_true',
+                        help="run pose, face and hands as one MediaPipe Holistic graph")
+    args = parser.parse_args()
+    
+    source = int(args.source) if args.source.isdigit() else args.source
+    system = HumanAnalysisSystem(source, holistic=args.holistic)
     system.run()
\ No newline at end of file
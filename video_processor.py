@@ -1,38 +1,116 @@
 import cv2
+import threading
 import numpy as np
 from datetime import datetime
+from queue import Queue
 
 class VideoProcessor:
-    def __init__(self):
+    # CPU encoders by FourCC; MJPG is intra-frame only and much cheaper than XVID
+    FOURCC_ENCODERS = {
+        'mjpg': 'MJPG',
+        'xvid': 'XVID'
+    }
+    # NVIDIA hardware H.264 encoder; requires OpenCV built with GStreamer
+    NVENC_PIPELINE = (
+        "appsrc ! videoconvert ! nvh264enc ! h264parse ! mp4mux ! "
+        "filesink location={path}"
+    )
+    # Overlay text is rendered once per (text, color) into a mask of this size
+    TEXT_BOX = (30, 380)
+    TEXT_BASELINE = 24
+    TEXT_CACHE_SIZE = 512
+    
+    def __init__(self, queue_size=4, encoder='mjpg'):
+        if encoder not in self.FOURCC_ENCODERS and encoder != 'nvenc':
+            raise ValueError(f"Unknown encoder: {encoder}")
+        self.encoder = encoder
+        # Container matching the encoder output, for building output paths
+        self.file_extension = 'mp4' if encoder == 'nvenc' else 'avi'
+        
         self.recording = False
         self.video_writer = None
         
+        # Encoding runs on a writer thread fed by a bounded queue, so a slow
+        # encoder applies back-pressure instead of growing memory
+        self.queue_size = queue_size
+        self.write_queue = None
+        self.writer_thread = None
+        # Recycled frame buffers: the writer hands each one back once encoded
+        self.free_buffers = None
+        
+        # Rasterized overlay labels and solid color patches to stamp them with
+        self._text_cache = {}
+        self._color_patches = {}
+        
     def start_recording(self, output_path, frame_size, fps=30):
         """Start recording video"""
-        fourcc = cv2.VideoWriter_fourcc(*'XVID')
-        self.video_writer = cv2.VideoWriter(output_path, fourcc, fps, frame_size)
+        self.video_writer = None
+        if self.encoder == 'nvenc':
+            pipeline = self.NVENC_PIPELINE.format(path=output_path)
+            self.video_writer = cv2.VideoWriter(pipeline, cv2.CAP_GSTREAMER, 0, fps, frame_size)
+            if not self.video_writer.isOpened():
+                print("NVENC pipeline unavailable, falling back to MJPG")
+                self.video_writer = None
+        
+        if self.video_writer is None:
+            fourcc = cv2.VideoWriter_fourcc(*self.FOURCC_ENCODERS.get(self.encoder, 'MJPG'))
+            self.video_writer = cv2.VideoWriter(output_path, fourcc, fps, frame_size)
+        
+        self.write_queue = Queue(maxsize=self.queue_size)
+        # One buffer per queue slot plus the one being encoded, allocated upfront
+        self.free_buffers = Queue()
+        width, height = frame_size
+        for _ in range(self.queue_size + 1):
+            self.free_buffers.put(np.empty((height, width, 3), dtype=np.uint8))
+        self.writer_thread = threading.Thread(
+            target=self._writer_loop, args=(self.video_writer, self.write_queue, self.free_buffers),
+            daemon=True
+        )
+        self.writer_thread.start()
         self.recording = True
         
+    def _writer_loop(self, video_writer, write_queue, free_buffers):
+        """Encode queued frames until the None sentinel arrives"""
+        while True:
+            frame = write_queue.get()
+            if frame is None:
+                break
+            video_writer.write(frame)
+            free_buffers.put(frame)
+        
     def stop_recording(self):
         """Stop recording video"""
+        self.recording = False
+        if self.writer_thread:
+            # Sentinel lets the writer drain the queued frames before exiting
+            self.write_queue.put(None)
+            self.writer_thread.join()
+            self.writer_thread = None
+            self.write_queue = None
+            self.free_buffers = None
         if self.video_writer:
             self.video_writer.release()
             self.video_writer = None
-        self.recording = False
         
     def write_frame(self, frame):
-        """Write frame to video if recording"""
-        if self.recording and self.video_writer:
-            self.video_writer.write(frame)
+        """Queue frame for the writer thread if recording"""
+        if self.recording and self.write_queue is not None:
+            # Copy so drawing on the frame afterwards cannot race the encoder; waiting
+            # for a recycled buffer applies the same back-pressure as the bounded queue
+            buffer = self.free_buffers.get()
+            if buffer.shape != frame.shape:
+                buffer = np.empty_like(frame)
+            np.copyto(buffer, frame)
+            self.write_queue.put(buffer)
             
     def draw_analysis_info(self, image, emotions, gestures, pose_detected, face_count):
         """Draw analysis information on the image"""
         h, w = image.shape[:2]
         
-        # Create overlay for information
-        overlay = image.copy()
-        cv2.rectangle(overlay, (10, 10), (400, 200), (0, 0, 0), -1)
-        image = cv2.addWeighted(overlay, 0.7, image, 0.3, 0)
+        # Darken the info panel in place: blending a black rectangle at 0.7
+        # is just scaling the pixels under it by 0.3, so only the ROI is touched
+        panel = image[10:201, 10:401]
+        cv2.convertScaleAbs(panel, dst=panel, alpha=0.3)
         
         # Display information
         y_offset = 40
@@ -41,25 +119,48 @@ class VideoProcessor:
         # Emotions
         for i, (emotion, confidence) in enumerate(emotions):
             text = f"Face {i+1}: {emotion} ({confidence:.2f})"
-            cv2.putText(image, text, (20, y_offset), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+            self._put_cached_text(image, text, (20, y_offset), (0, 255, 255))
             y_offset += line_height
             
         # Gestures
         for i, (gesture, confidence) in enumerate(gestures):
             text = f"Hand {i+1}: {gesture} ({confidence:.2f})"
-            cv2.putText(image, text, (20, y_offset), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
+            self._put_cached_text(image, text, (20, y_offset), (255, 255, 0))
             y_offset += line_height
             
         # Body detection status
         body_status = "Body: Detected" if pose_detected else "Body: Not Detected"
-        cv2.putText(image, body_status, (20, y_offset), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 255), 2)
+        self._put_cached_text(image, body_status, (20, y_offset), (255, 0, 255))
         y_offset += line_height
         
         # Face count
-        cv2.putText(image, f"Faces: {face_count}", (20, y_offset), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+        self._put_cached_text(image, f"Faces: {face_count}", (20, y_offset), (0, 255, 0))
+        
+        return image
+    
+    def _put_cached_text(self, image, text, org, color):
+        """Stamp a label rendered once per (text, color) instead of rasterizing it every frame"""
+        x, y = org
+        top = y - self.TEXT_BASELINE
+        roi = image[top:top + self.TEXT_BOX[0], x:x + self.TEXT_BOX[1]]
+        if top < 0 or roi.shape[:2] != self.TEXT_BOX:
+            # Label box would leave the frame; draw directly
+            cv2.putText(image, text, org, cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+            return
+        
+        key = (text, color)
+        mask = self._text_cache.get(key)
+        if mask is None:
+            # Confidences are rounded to 2 decimals, but bound the cache anyway
+            if len(self._text_cache) >= self.TEXT_CACHE_SIZE:
+                self._text_cache.clear()
+            mask = np.zeros(self.TEXT_BOX, dtype=np.uint8)
+            cv2.putText(mask, text, (0, self.TEXT_BASELINE), cv2.FONT_HERSHEY_SIMPLEX, 0.6, 255, 2)
+            self._text_cache[key] = mask
         
-        return image
\ No newline at end of file
+        patch = self._color_patches.get(color)
+        if patch is None:
+            patch = np.empty(self.TEXT_BOX + (3,), dtype=np.uint8)
+            patch[:] = color
+            self._color_patches[color] = patch
+        cv2.copyTo(patch, mask, roi)
\ No newline at end of file